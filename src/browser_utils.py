@@ -0,0 +1,13 @@
+"""
+Browser helpers shared by the SmugMug Playwright scripts
+"""
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+
+async def wait_for_settle(page, timeout=3000):
+    """Wait until the page's network goes quiet, capped at timeout ms, instead of sleeping a fixed time"""
+    try:
+        await page.wait_for_load_state('networkidle', timeout=timeout)
+    except PlaywrightTimeoutError:
+        pass  # Some trackers never go idle; carry on with whatever has loaded
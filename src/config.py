@@ -5,11 +5,16 @@ Handles loading and parsing of environment variables and configuration.
 """
 
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 
 
+@lru_cache(maxsize=1)
 def load_credentials():
-    """Load SmugMug API credentials from .env file"""
+    """Load SmugMug API credentials from .env file
+    
+    The result is cached; call load_credentials.cache_clear() to re-read .env.
+    """
     
     # Load .env file from project root
     env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
@@ -31,11 +36,21 @@ def load_credentials():
     return credentials
 
 
+@lru_cache(maxsize=1)
 def get_project_root():
     """Get the project root directory"""
     return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
+@lru_cache(maxsize=1)
 def get_output_directory():
     """Get the output directory path"""
     return os.path.join(get_project_root(), 'output')
+
+
+@lru_cache(maxsize=1)
+def ensure_output_directory():
+    """Create the output directory if needed (only checked once) and return its path"""
+    output_dir = get_output_directory()
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir
@@ -4,8 +4,190 @@ Debug script to analyze SmugMug gallery structure
 """
 
 import asyncio
+import os
+import re
+import sys
+from collections import Counter
 from playwright.async_api import async_playwright
 
+# Add the parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.browser_utils import wait_for_settle
+from src.config import ensure_output_directory
+
+# Runs every probe inside the page and returns counts plus a few sample elements,
+# so each analysis section costs a single round-trip to the browser. All probes
+# share one compound querySelectorAll (a single DOM walk); matches are then
+# classified per probe with Element.matches().
+# Each probe is [label, css, text]; text (if set) mimics Playwright's :has-text().
+PROBE_SELECTORS_JS = """
+(probes) => {
+    const combined = [...new Set(probes.map(([, css]) => css))].join(', ');
+    const matches = probes.map(() => []);
+    for (const e of document.querySelectorAll(combined)) {
+        let text = null;
+        probes.forEach(([, css, needle], i) => {
+            if (!e.matches(css)) return;
+            if (needle) {
+                if (text === null) text = (e.innerText || '').toLowerCase();
+                if (!text.includes(needle.toLowerCase())) return;
+            }
+            matches[i].push(e);
+        });
+    }
+    return probes.map(([label], i) => ({
+        selector: label,
+        count: matches[i].length,
+        samples: matches[i].slice(0, 3).map(e => ({
+            text: e.innerText,
+            href: e.getAttribute('href'),
+            cls: e.getAttribute('class'),
+            tag: e.tagName
+        }))
+    }));
+}
+"""
+
+CLICKABLE_ELEMENTS_JS = """
+(limit) => {
+    const els = [...document.querySelectorAll('button, a, [role="button"]')];
+    return {
+        count: els.length,
+        samples: els.slice(0, limit).map(e => ({
+            text: e.innerText,
+            cls: e.getAttribute('class'),
+            tag: e.tagName
+        }))
+    };
+}
+"""
+
+
+def has_text(css, text):
+    """Build a probe equivalent to the Playwright selector css:has-text("text")"""
+    return [f'{css}:has-text("{text}")', css, text]
+
+
+def css_probe(css):
+    """Build a probe for a plain CSS selector"""
+    return [css, css, None]
+
+
+GALLERY_URL = "https://triggbowlin.smugmug.com/Dragonhood/n-B4hbdN"
+GALLERY_PASSWORD = "firebreathing"
+
+
+async def open_gallery(page):
+    """Navigate to the gallery and enter the password if prompted"""
+    await page.goto(GALLERY_URL, timeout=30000)
+    await wait_for_settle(page, timeout=5000)
+    
+    password_input = await page.query_selector('input[type="password"]')
+    if password_input:
+        print("Entering password...")
+        await password_input.fill(GALLERY_PASSWORD)
+        await password_input.press('Enter')
+        await wait_for_settle(page, timeout=5000)
+
+
+async def probe_pagination(page):
+    """Analyze pagination on the gallery page; returns report lines"""
+    report = ["\n1. PAGINATION ANALYSIS:"]
+    pagination_probes = [
+        has_text('a', 'Next'),
+        has_text('button', 'Next'),
+        has_text('a', '2'),
+        has_text('a', 'Show more'),
+        has_text('button', 'Load more'),
+        css_probe('.pagination'),
+        css_probe('.sm-pagination'),
+        css_probe('[class*="page"]'),
+        css_probe('[class*="next"]'),
+        css_probe('a[rel="next"]')
+    ]
+    
+    for result in await page.evaluate(PROBE_SELECTORS_JS, pagination_probes):
+        selector = result['selector']
+        if result['count']:
+            report.append(f"  ✓ Found {result['count']} elements with: {selector}")
+            for i, sample in enumerate(result['samples']):  # Show first 3
+                report.append(f"    [{i+1}] Text: '{sample['text']}' | Href: {sample['href']}")
+        else:
+            report.append(f"  - No elements found with: {selector}")
+    
+    # Get page HTML to analyze structure
+    report.append("\n2. PAGE STRUCTURE ANALYSIS:")
+    page_html = await page.content()
+    
+    # Look for pagination keywords in HTML (one pass over the lowercased page)
+    pagination_keywords = ['next', 'page', 'more', '2', 'pagination']
+    keyword_pattern = re.compile('|'.join(re.escape(k) for k in sorted(pagination_keywords, key=len, reverse=True)))
+    keyword_counts = Counter(match.group() for match in keyword_pattern.finditer(page_html.lower()))
+    for keyword in pagination_keywords:
+        count = keyword_counts[keyword]
+        if count > 0:
+            report.append(f"  - '{keyword}' appears {count} times in HTML")
+    
+    await page.screenshot(path=os.path.join(ensure_output_directory(), 'debug_gallery_main.png'))
+    report.append(f"Screenshot saved: debug_gallery_main.png")
+    return report
+
+
+async def probe_lightbox(page):
+    """Open the first image in its own tab and analyze the lightbox; returns report lines"""
+    await open_gallery(page)
+    
+    # Click on first image to analyze lightbox
+    report = ["\n3. LIGHTBOX ANALYSIS:"]
+    # Count in the page and take a handle to the first match only
+    image_selector = 'a[href*="/i-"], img'
+    image_count = await page.evaluate('(sel) => document.querySelectorAll(sel).length', image_selector)
+    if not image_count:
+        report.append("No image elements found")
+        return report
+        
+    report.append(f"Found {image_count} image elements, clicking first one...")
+    first_image = await page.query_selector(image_selector)
+    await first_image.click()
+    await wait_for_settle(page, timeout=5000)
+    
+    # Look for comment-related elements
+    report.append("\n4. COMMENT BUTTON ANALYSIS:")
+    comment_button_probes = [
+        has_text('button', 'view comments'),
+        has_text('button', 'View Comments'),
+        has_text('a', 'Comments'),
+        has_text('button', 'comments'),
+        css_probe('[class*="comment"]'),
+        css_probe('button[aria-label*="comment"]'),
+        css_probe('.sm-comments-toggle')
+    ]
+    
+    for result in await page.evaluate(PROBE_SELECTORS_JS, comment_button_probes):
+        selector = result['selector']
+        if result['count']:
+            report.append(f"  ✓ Found comment button with: {selector}")
+            report.append(f"    Text: '{result['samples'][0]['text']}'")
+        else:
+            report.append(f"  - No comment button found with: {selector}")
+    
+    # Show all buttons on the page
+    report.append("\n5. ALL BUTTONS ANALYSIS:")
+    all_buttons = await page.evaluate(CLICKABLE_ELEMENTS_JS, 20)  # Show first 20
+    report.append(f"Found {all_buttons['count']} clickable elements:")
+    
+    for i, button in enumerate(all_buttons['samples']):
+        text = (button['text'] or '').strip()
+        if text and len(text) < 50:
+            report.append(f"  [{i+1}] {button['tag']}: '{text}' | Classes: {button['cls']}")
+    
+    # Take screenshots for manual analysis
+    await page.screenshot(path=os.path.join(ensure_output_directory(), 'debug_lightbox.png'))
+    report.append(f"\nScreenshot saved: debug_lightbox.png")
+    return report
+
+
 async def debug_gallery_structure():
     print("SmugMug Gallery Structure Debugger")
     print("=" * 50)
@@ -13,116 +195,23 @@ async def debug_gallery_structure():
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=False)
         context = await browser.new_context()
-        page = await context.new_page()
+        gallery_page = await context.new_page()
         
         try:
-            # Navigate to gallery
-            gallery_url = "https://triggbowlin.smugmug.com/Dragonhood/n-B4hbdN"
-            print(f"Navigating to: {gallery_url}")
-            await page.goto(gallery_url, timeout=30000)
+            # Navigate to gallery (the password cookie is shared by every tab in the context)
+            print(f"Navigating to: {GALLERY_URL}")
+            await open_gallery(gallery_page)
             
-            # Enter password
-            await page.wait_for_timeout(3000)
-            password_input = await page.query_selector('input[type="password"]')
-            if password_input:
-                print("Entering password...")
-                await password_input.fill("firebreathing")
-                await password_input.press('Enter')
-                await page.wait_for_timeout(3000)
+            # Run the independent probes side by side in two tabs
+            lightbox_page = await context.new_page()
+            pagination_report, lightbox_report = await asyncio.gather(
+                probe_pagination(gallery_page),
+                probe_lightbox(lightbox_page)
+            )
             
             print("\n--- GALLERY PAGE ANALYSIS ---")
-            
-            # Check pagination elements
-            print("\n1. PAGINATION ANALYSIS:")
-            pagination_selectors = [
-                'a:has-text("Next")',
-                'button:has-text("Next")', 
-                'a:has-text("2")',
-                'a:has-text("Show more")',
-                'button:has-text("Load more")',
-                '.pagination',
-                '.sm-pagination',
-                '[class*="page"]',
-                '[class*="next"]',
-                'a[rel="next"]'
-            ]
-            
-            for selector in pagination_selectors:
-                elements = await page.query_selector_all(selector)
-                if elements:
-                    print(f"  ✓ Found {len(elements)} elements with: {selector}")
-                    for i, element in enumerate(elements[:3]):  # Show first 3
-                        try:
-                            text = await element.inner_text()
-                            href = await element.get_attribute('href') if element else None
-                            print(f"    [{i+1}] Text: '{text}' | Href: {href}")
-                        except:
-                            print(f"    [{i+1}] Could not read element")
-                else:
-                    print(f"  - No elements found with: {selector}")
-            
-            # Get page HTML to analyze structure
-            print("\n2. PAGE STRUCTURE ANALYSIS:")
-            page_html = await page.content()
-            
-            # Look for pagination keywords in HTML
-            pagination_keywords = ['next', 'page', 'more', '2', 'pagination']
-            for keyword in pagination_keywords:
-                count = page_html.lower().count(keyword)
-                if count > 0:
-                    print(f"  - '{keyword}' appears {count} times in HTML")
-            
-            # Click on first image to analyze lightbox
-            print("\n3. LIGHTBOX ANALYSIS:")
-            image_links = await page.query_selector_all('a[href*="/i-"], img')
-            if image_links:
-                print(f"Found {len(image_links)} image elements, clicking first one...")
-                await image_links[0].click()
-                await page.wait_for_timeout(3000)
-                
-                # Look for comment-related elements
-                print("\n4. COMMENT BUTTON ANALYSIS:")
-                comment_button_selectors = [
-                    'button:has-text("view comments")',
-                    'button:has-text("View Comments")',
-                    'a:has-text("Comments")',
-                    'button:has-text("comments")',
-                    '[class*="comment"]',
-                    'button[aria-label*="comment"]',
-                    '.sm-comments-toggle'
-                ]
-                
-                for selector in comment_button_selectors:
-                    elements = await page.query_selector_all(selector)
-                    if elements:
-                        print(f"  ✓ Found comment button with: {selector}")
-                        element = elements[0]
-                        text = await element.inner_text()
-                        print(f"    Text: '{text}'")
-                    else:
-                        print(f"  - No comment button found with: {selector}")
-                
-                # Show all buttons on the page
-                print("\n5. ALL BUTTONS ANALYSIS:")
-                all_buttons = await page.query_selector_all('button, a, [role="button"]')
-                print(f"Found {len(all_buttons)} clickable elements:")
-                
-                for i, button in enumerate(all_buttons[:20]):  # Show first 20
-                    try:
-                        text = await button.inner_text()
-                        tag = await button.evaluate('el => el.tagName')
-                        classes = await button.get_attribute('class')
-                        if text and len(text.strip()) > 0 and len(text.strip()) < 50:
-                            print(f"  [{i+1}] {tag}: '{text.strip()}' | Classes: {classes}")
-                    except:
-                        continue
-                
-                # Take screenshots for manual analysis
-                await page.screenshot(path="/Users/trigg/Development/SmugMug-Client-Selection-Tool/output/debug_lightbox.png")
-                print(f"\nScreenshot saved: debug_lightbox.png")
-            
-            await page.screenshot(path="/Users/trigg/Development/SmugMug-Client-Selection-Tool/output/debug_gallery_main.png")
-            print(f"Screenshot saved: debug_gallery_main.png")
+            for line in pagination_report + lightbox_report:
+                print(line)
             
         except Exception as e:
             print(f"Error during debugging: {str(e)}")
@@ -9,15 +9,50 @@ allowing photographers to generate lists of client-selected images for further p
 import os
 import sys
 import json
+import re
+import shelve
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import NamedTuple
+from requests.adapters import HTTPAdapter
+from requests_oauthlib import OAuth1
 from urllib.parse import urlparse, parse_qs
-import time
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+try:
+    import orjson  # Faster JSON decoding for large album responses
+except ImportError:
+    orjson = None
 
 # Add the parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.config import load_credentials
+from src.config import load_credentials, get_project_root, ensure_output_directory
+
+# Headers sent with every SmugMug API request
+# (Accept-Encoding only advertises br when brotli is installed, so urllib3 can decode it)
+_HEADERS = {
+    'Accept': 'application/json',
+    'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],
+    'User-Agent': 'SmugMug-Client-Selection-Tool/1.0'
+}
+
+# Maximum number of API requests in flight at once
+MAX_WORKERS = 16
+
+# Characters stripped from album names when building output filenames.
+# \w matches exactly str.isalnum() plus '_', so this keeps letters, digits, ' ', '-' and '_'
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^\w \-]')
+
+
+class CommentedImage(NamedTuple):
+    """An album image that has at least one comment"""
+    filename: str
+    image_key: str
+    comment_count: int
+    comments: list
 
 
 class SmugMugClient:
@@ -25,12 +60,28 @@ class SmugMugClient:
         self.credentials = load_credentials()
         self.base_url = "https://api.smugmug.com/api/v2"
         self.session = requests.Session()
+        # Keep one pooled connection per worker so parallel requests reuse TLS sessions,
+        # and only back off when SmugMug signals rate limiting or overload
+        retry = Retry(
+            total=5,
+            status_forcelist=(429, 503),
+            backoff_factor=0.5,
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(_HEADERS)
         self.setup_oauth_session()
+        # One worker pool for the lifetime of the client, shared by all parallel fetches
+        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        
+    def close(self):
+        """Shut down the worker pool and release pooled connections"""
+        self.executor.shutdown(wait=True)
+        self.session.close()
         
     def setup_oauth_session(self):
         """Set up OAuth 1.0a session with SmugMug credentials"""
-        from requests_oauthlib import OAuth1
-        
         auth = OAuth1(
             self.credentials['consumer_key'],
             client_secret=self.credentials['consumer_secret'],
@@ -43,22 +94,15 @@ class SmugMugClient:
         """Make authenticated request to SmugMug API with error handling"""
         url = f"{self.base_url}{endpoint}"
         
-        # Add proper headers for SmugMug API
-        headers = {
-            'Accept': 'application/json',
-            'User-Agent': 'SmugMug-Client-Selection-Tool/1.0'
-        }
-        
         try:
-            response = self.session.get(url, params=params, headers=headers)
+            response = self.session.get(url, params=params)
             response.raise_for_status()
             
-            # Rate limiting - be respectful
-            time.sleep(0.1)
-            
+            if orjson is not None:
+                return orjson.loads(response.content)
             return response.json()
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
             print(f"Error making request to {endpoint}: {e}")
             return None
             
@@ -82,95 +126,155 @@ class SmugMugClient:
         return albums
         
     def get_album_images(self, album_key):
-        """Get all images in a specific album"""
+        """Yield the images in a specific album page by page, with their comments expanded inline"""
         print(f"Fetching images from album...")
         
-        images = []
-        start = 1
         count = 100  # Get images in batches
         
-        while True:
-            params = {'start': start, 'count': count}
-            response = self.make_request(f"/album/{album_key}!images", params)
-            
-            if not response or 'Response' not in response:
-                break
-                
-            batch_images = response['Response'].get('AlbumImage', [])
-            if not batch_images:
-                break
+        # The first page tells us how many images there are in total
+        response = self._get_album_page(album_key, 1, count)
+        if not response:
+            return
+        yield from self._album_page_images(response)
+        
+        # Fetch the remaining pages concurrently; map() still yields them in album order
+        total = response['Response'].get('Pages', {}).get('Total', 0)
+        starts = range(1 + count, total + 1, count)
+        pages = self.executor.map(lambda start: self._get_album_page(album_key, start, count), starts)
+        for response in pages:
+            if response:
+                yield from self._album_page_images(response)
                 
-            images.extend(batch_images)
+    def _get_album_page(self, album_key, start, count):
+        """Fetch one page of album images, or None if the request failed"""
+        # Ask for filenames and comments in the same request so no
+        # per-image lookups are needed afterwards
+        params = {
+            'start': start,
+            'count': count,
+            '_expand': 'ImageComments',
+            '_filter': 'ImageKey,FileName,LastUpdated',
+            '_filteruri': 'ImageComments'
+        }
+        response = self.make_request(f"/album/{album_key}!images", params)
+        
+        if not response or 'Response' not in response:
+            return None
+        return response
+        
+    def _album_page_images(self, response):
+        """Return a page's album images with their expanded comments attached"""
+        batch_images = response['Response'].get('AlbumImage', [])
+        expansions = response.get('Expansions', {})
+        for album_image in batch_images:
+            album_image['Comments'] = self._expanded_comments(album_image, expansions)
             
-            # Check if we got all images
-            if len(batch_images) < count:
-                break
-                
-            start += count
+        # Report progress once per page rather than once per image
+        if batch_images:
+            start = response['Response'].get('Pages', {}).get('Start', 1)
+            print(f"Checked {start + len(batch_images) - 1} images...", end='\r')
+            
+        return batch_images
+        
+    def _expanded_comments(self, album_image, expansions):
+        """Return the inline comments for an album image, or None if they were not all expanded"""
+        comments_uri = album_image.get('Uris', {}).get('ImageComments', {}).get('Uri')
+        expansion = expansions.get(comments_uri)
+        if expansion is None:
+            return None
+            
+        comments = expansion.get('Comment', [])
+        
+        # Expansions only carry the first page of a collection
+        total = expansion.get('Pages', {}).get('Total', len(comments))
+        if total > len(comments):
+            return None
             
-        print(f"Found {len(images)} images in album")
-        return images
+        return comments
         
     def get_image_comments(self, image_key, serial=0):
-        """Check if an image has comments"""
+        """Fetch all comments for an image (None if the request failed)"""
         # SmugMug requires serial number format: imagekey-serial
         full_image_key = f"{image_key}-{serial}"
         response = self.make_request(f"/image/{full_image_key}!comments")
         
         if not response or 'Response' not in response:
-            return []
+            return None
             
         comments = response['Response'].get('Comment', [])
         return comments
         
-    def get_image_details(self, image_key, serial=0):
-        """Get detailed information about an image including filename"""
-        # SmugMug requires serial number format: imagekey-serial
-        full_image_key = f"{image_key}-{serial}"
-        response = self.make_request(f"/image/{full_image_key}")
+    def fill_missing_comments(self, album_images):
+        """Fill in comments for album images from the on-disk cache, fetching the rest in parallel"""
+        cache_dir = os.path.join(get_project_root(), '.cache')
+        os.makedirs(cache_dir, exist_ok=True)
         
-        if not response or 'Response' not in response:
+        with shelve.open(os.path.join(cache_dir, 'comments')) as cache:
+            to_fetch = []
+            for album_image in album_images:
+                cache_key = self._comment_cache_key(album_image)
+                if cache_key and cache_key in cache:
+                    album_image['Comments'] = cache[cache_key]
+                else:
+                    to_fetch.append(album_image)
+                    
+            if not to_fetch:
+                return
+                
+            print(f"Fetching remaining comments for {len(to_fetch)} images...")
+            image_keys = [album_image['ImageKey'] for album_image in to_fetch]
+            for album_image, comments in zip(to_fetch, self.executor.map(self.get_image_comments, image_keys)):
+                if comments is None:
+                    # Request failed - don't cache, just treat as no comments
+                    album_image['Comments'] = []
+                    continue
+                    
+                album_image['Comments'] = comments
+                cache_key = self._comment_cache_key(album_image)
+                if cache_key:
+                    cache[cache_key] = comments
+                        
+    def _comment_cache_key(self, album_image):
+        """Cache key for an image's comments; LastUpdated changes when comments are added"""
+        last_updated = album_image.get('LastUpdated')
+        if not last_updated:
             return None
-            
-        return response['Response']['Image']
+        return f"{album_image['ImageKey']}:{last_updated}"
         
     def process_album_for_comments(self, album_key, album_name):
         """Process an entire album and find images with comments"""
         print(f"\nProcessing album: {album_name}")
         print("=" * 50)
         
-        # Get all images in the album
-        album_images = self.get_album_images(album_key)
+        # Stream the album, only holding on to images that have (or may have) comments
+        image_count = 0
+        album_images = []
+        for album_image in self.get_album_images(album_key):
+            image_count += 1
+            if album_image['Comments'] is None or album_image['Comments']:
+                album_images.append(album_image)
+                
+        print(f"\nFound {image_count} images in album")
         
-        if not album_images:
+        if not image_count:
             print("No images found in this album")
             return []
             
-        commented_images = []
-        
-        for i, album_image in enumerate(album_images):
-            image_key = album_image['ImageKey']
-            
-            # Show progress
-            print(f"Checking image {i+1}/{len(album_images)}...", end='\r')
+        # Look up comments for any images whose expansion was incomplete
+        pending = [album_image for album_image in album_images if album_image['Comments'] is None]
+        if pending:
+            self.fill_missing_comments(pending)
             
-            # Check for comments
-            comments = self.get_image_comments(image_key)
-            
-            if comments:
-                # Get image details including filename
-                image_details = self.get_image_details(image_key)
-                
-                if image_details:
-                    filename = image_details.get('FileName', f'Image_{image_key}')
-                    comment_count = len(comments)
-                    
-                    commented_images.append({
-                        'filename': filename,
-                        'image_key': image_key,
-                        'comment_count': comment_count,
-                        'comments': comments
-                    })
+        commented_images = [
+            CommentedImage(
+                filename=album_image.get('FileName') or f"Image_{album_image['ImageKey']}",
+                image_key=album_image['ImageKey'],
+                comment_count=len(album_image['Comments']),
+                comments=album_image['Comments']
+            )
+            for album_image in album_images
+            if album_image['Comments']
+        ]
         
         print(f"\nFound {len(commented_images)} images with comments")
         return commented_images
@@ -182,44 +286,48 @@ class SmugMugClient:
             return
             
         # Create output directory if it doesn't exist
-        output_dir = "/Users/trigg/Development/SmugMug-Client-Selection-Tool/output"
-        os.makedirs(output_dir, exist_ok=True)
+        output_dir = ensure_output_directory()
         
         # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_album_name = "".join(c for c in album_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        safe_album_name = _UNSAFE_FILENAME_CHARS.sub('', album_name).rstrip()
         filename = f"commented_images_{safe_album_name}_{timestamp}.txt"
         filepath = os.path.join(output_dir, filename)
         
-        # Write the results
-        with open(filepath, 'w') as f:
-            f.write(f"Images with Comments - {album_name}\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("=" * 50 + "\n\n")
-            
-            for item in commented_images:
-                f.write(f"{item['filename']}\n")
-                
-            f.write(f"\nTotal: {len(commented_images)} images with comments\n")
+        # Build the whole report first, then write it in one go
+        lines = [
+            f"Images with Comments - {album_name}\n",
+            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+            "=" * 50 + "\n\n"
+        ]
+        
+        for item in commented_images:
+            lines.append(f"{item.filename}\n")
             
-            # Optional: include comment details
-            f.write("\n" + "=" * 50 + "\n")
-            f.write("COMMENT DETAILS:\n")
-            f.write("=" * 50 + "\n\n")
+        lines.append(f"\nTotal: {len(commented_images)} images with comments\n")
+        
+        # Optional: include comment details
+        lines.append("\n" + "=" * 50 + "\n")
+        lines.append("COMMENT DETAILS:\n")
+        lines.append("=" * 50 + "\n\n")
+        
+        for item in commented_images:
+            lines.append(f"File: {item.filename}\n")
+            lines.append(f"Comments ({item.comment_count}):\n")
             
-            for item in commented_images:
-                f.write(f"File: {item['filename']}\n")
-                f.write(f"Comments ({item['comment_count']}):\n")
-                
-                for comment in item['comments']:
-                    author = comment.get('Name', 'Anonymous')
-                    text = comment.get('Text', '')
-                    date = comment.get('Date', '')
-                    f.write(f"  - {author}: {text}\n")
-                    if date:
-                        f.write(f"    {date}\n")
-                        
-                f.write("\n")
+            for comment in item.comments:
+                author = comment.get('Name', 'Anonymous')
+                text = comment.get('Text', '')
+                date = comment.get('Date', '')
+                lines.append(f"  - {author}: {text}\n")
+                if date:
+                    lines.append(f"    {date}\n")
+                    
+            lines.append("\n")
+        
+        # Encode once up front; comments often contain non-ASCII text
+        with open(filepath, 'wb') as f:
+            f.write("".join(lines).encode('utf-8'))
         
         print(f"\nResults saved to: {filepath}")
         return filepath
@@ -230,6 +338,7 @@ def main():
     print("SmugMug Client Selection Tool")
     print("=" * 40)
     
+    client = None
     try:
         client = SmugMugClient()
         
@@ -283,7 +392,7 @@ def main():
             # Show first few filenames as preview
             print(f"\nPreview of commented image filenames:")
             for i, item in enumerate(commented_images[:10]):
-                print(f"  {item['filename']}")
+                print(f"  {item.filename}")
                 
             if len(commented_images) > 10:
                 print(f"  ... and {len(commented_images) - 10} more")
@@ -294,6 +403,9 @@ def main():
         print("\n\nOperation cancelled by user")
     except Exception as e:
         print(f"\nError: {e}")
+    finally:
+        if client:
+            client.close()
         
 
 if __name__ == "__main__":
@@ -10,52 +10,329 @@ import asyncio
 import os
 import sys
 from datetime import datetime
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 import re
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import uvloop  # Faster event loop for the browser protocol traffic
+except ImportError:
+    uvloop = None
 
 # Add the parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src.browser_utils import wait_for_settle
+from src.config import ensure_output_directory
+from src.target_names import CLIENT_MATCHER_JS, CLIENT_MATCHER_ARGS
+
+# Patterns used to pull a filename out of overlay text, titles, URLs and image sources
+_FILENAME_RE = re.compile(r'([^/\\:]*\.(jpg|jpeg|png|gif|raw|dng|tiff|bmp|cr2|nef|arw))', re.IGNORECASE)
+_URL_IMAGE_ID_RE = re.compile(r'/i-([a-zA-Z0-9]+)')
+_IMG_SRC_FILENAME_RE = re.compile(r'/([^/]*\.(jpg|jpeg|png|gif|raw|dng|tiff|bmp))', re.IGNORECASE)
+
+# Number of browser tabs checking lightbox images at the same time
+SCRAPE_WORKERS = 4
+
+# Present once a lightbox view has rendered enough to be inspected
+_LIGHTBOX_READY_SELECTOR = '[class*="comment"], .sm-lightbox-image'
+
+# Scrolls to the bottom every intervalMs until the gallery image count has not
+# changed for stableTicks checks in a row (or maxTicks is reached), resolving
+# with the final count
+SCROLL_UNTIL_STABLE_JS = """
+(opts) => new Promise(resolve => {
+    const count = () => document.querySelectorAll(opts.selector).length;
+    let last = count();
+    let stable = 0;
+    let ticks = 0;
+    const tick = () => {
+        window.scrollTo(0, document.body.scrollHeight);
+        const n = count();
+        if (n === last) {
+            stable++;
+        } else {
+            stable = 0;
+            last = n;
+        }
+        if (stable >= opts.stableTicks || ++ticks >= opts.maxTicks) return resolve(n);
+        setTimeout(tick, opts.intervalMs);
+    };
+    tick();
+})
+"""
+
+# Returns the de-duplicated gallery image URLs (absolute link hrefs, or image srcs
+# when the gallery has no image links), the selector they came from, whether they
+# are links, and the raw match count
+UNIQUE_IMAGE_URLS_JS = """
+() => {
+    let selector = 'a[href*="/i-"]';
+    let elements = [...document.querySelectorAll(selector)];
+    if (!elements.length) {
+        selector = 'img[src*="smugmug"], .sm-tile img, .sm-gallery-image img';
+        elements = [...document.querySelectorAll(selector)];
+    }
+    const links = selector.startsWith('a');
+    const urls = new Set();
+    for (const e of elements) {
+        const url = links ? e.href : e.getAttribute('src');  // e.href is already absolute
+        if (url) urls.add(url);
+    }
+    return {selector, links, rawCount: elements.length, urls: [...urls]};
+}
+"""
+
+# Comment selectors, most specific first; the first that yields a match wins
+_COMMENT_SELECTORS = [
+    '.sm-user-ui-comments .sm-user-ui-comment',
+    '.sm-comments .sm-comment',
+    '.comments .comment',
+    '[class*="comment"]',
+    '[id*="comment"]',
+    '.sm-comment',
+    '.sm-comments',
+    'div[class*="user"]',
+    'div[class*="message"]',
+    'span[class*="comment"]',
+    'p[class*="comment"]'
+]
+
+# Container whose text is checked for the client's name (falls back to the whole body)
+_COMMENTS_CONTAINER_SELECTOR = '.sm-comments, .sm-user-ui-comments'
+
+# Selectors for the filename overlay SmugMug shows on lightbox images
+_OVERLAY_SELECTORS = [
+    '.sm-lightbox-overlay-text',
+    '.sm-image-overlay',
+    '.sm-filename-overlay',
+    '[class*="overlay"][class*="text"]',
+    '[class*="filename"]',
+    '.sm-lightbox-info',
+    '.sm-image-title',
+    '.sm-image-name'
+]
+
+# Reads everything needed from the current lightbox view in one round-trip:
+# whether the client is mentioned, their comment texts, and every filename
+# candidate. Filename candidates are only gathered when the client is mentioned
+# and opts.findFilename is set (unset when the view's filename is already known).
+EXTRACT_IMAGE_DATA_JS = """
+(opts) => {
+    const {mentions, clientOf} = (""" + CLIENT_MATCHER_JS + """)(opts.clients);
+    const filenameRe = new RegExp(opts.filenamePattern, 'i');
+    const imgSrcRe = new RegExp(opts.imgSrcPattern, 'i');
+    // textContent of the comments container avoids the forced layout of body.innerText.
+    // It runs adjacent elements together, which mentions() allows for.
+    const scope = document.querySelector(opts.commentsContainerSelector) || document.body;
+    const data = {
+        hasTarget: mentions(scope.textContent || ''),
+        comments: [],
+        selector: null,
+        textBlocks: [],
+        overlayFilename: null,
+        bottomFilename: null,
+        titleFilename: null,
+        imgSrcFilename: null,
+        url: location.href
+    };
+    if (!data.hasTarget) return data;
+
+    // Comment elements mentioning the client, from the first selector that has any.
+    // One query over the union of selectors; hits are then attributed to selectors.
+    const hits = [...document.querySelectorAll(opts.commentSelectors.join(', '))]
+        .map(e => ({el: e, text: e.innerText}))
+        .filter(h => h.text && mentions(h.text));
+    const sel = opts.commentSelectors.find(s => hits.some(h => h.el.matches(s)));
+    if (sel) {
+        data.comments = hits.filter(h => h.el.matches(sel))
+            .map(h => ({text: h.text.trim(), author: clientOf(h.text)}));
+        data.selector = sel;
+    }
+
+    // Fall back to lines of page text mentioning the client
+    if (!data.comments.length) {
+        data.textBlocks = (document.body.innerText || '').split('\\n')
+            .map(b => b.trim())
+            .filter(b => b.length > 10 && mentions(b))
+            .map(b => ({text: b, author: clientOf(b)}));
+    }
+    if (!opts.findFilename) return data;
+
+    // Method 1: filename overlay text
+    for (const sel of opts.overlaySelectors) {
+        const el = document.querySelector(sel);
+        const match = el && (el.innerText || '').match(filenameRe);
+        if (match) {
+            data.overlayFilename = match[1];
+            break;
+        }
+    }
+
+    // Method 2: any short text element in the bottom area. This walks the whole
+    // page, and only matters when the overlay had nothing.
+    if (!data.overlayFilename) {
+        for (const el of document.querySelectorAll('div, span, p')) {
+            const text = el.innerText;
+            if (!text || text.length >= 100) continue;  // Filename shouldn't be too long
+            const match = text.match(filenameRe);
+            if (match && el.getBoundingClientRect().y > 400) {  // Likely in bottom area
+                data.bottomFilename = match[1];
+                break;
+            }
+        }
+    }
+
+    // Method 3: page title
+    if (document.title && document.title !== 'SmugMug') {
+        const match = document.title.match(filenameRe);
+        if (match) data.titleFilename = match[1];
+    }
+
+    // Method 5: image src attribute
+    const img = document.querySelector('img[src*="smugmug"]');
+    const srcMatch = img && (img.getAttribute('src') || '').match(imgSrcRe);
+    if (srcMatch) data.imgSrcFilename = srcMatch[1];
+
+    return data;
+}
+"""
+
+# Only text is read, so Chromium can skip image downloads. This is a launch flag rather
+# than context.route: routing sends every request through Python and turns off the HTTP
+# cache, so each lightbox navigation would re-download SmugMug's scripts.
+_BROWSER_ARGS = ['--disable-gpu', '--disable-dev-shm-usage', '--blink-settings=imagesEnabled=false']
+
+
 class SmugMugWebScraper:
     def __init__(self, gallery_url, password):
         self.gallery_url = gallery_url
         self.password = password
         self.commented_images = []
         self.output_file = None
+        self._out_fh = None
+        # A single writer thread keeps writes from concurrent tabs in order and never
+        # touches the file handle from two threads at once
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._filename_cache = {}  # lightbox URL -> filename
         self._setup_output_file()
     
     def _setup_output_file(self, album_name="Dragonhood"):
         """Setup output file for iterative writing"""
         # Create output directory if it doesn't exist
-        output_dir = "/Users/trigg/Development/SmugMug-Client-Selection-Tool/output"
-        os.makedirs(output_dir, exist_ok=True)
+        output_dir = ensure_output_directory()
         
         # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"commented_images_{album_name}_webscrape_{timestamp}.txt"
         self.output_file = os.path.join(output_dir, filename)
         
-        # Write header
-        with open(self.output_file, 'w') as f:
-            f.write(f"Images with Comments - {album_name} (Web Scrape)\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Gallery URL: {self.gallery_url}\n")
-            f.write("=" * 50 + "\n")
-            f.write("LIVE RESULTS (written as found):\n")
-            f.write("=" * 50 + "\n\n")
+        # Write header and keep the file open for live results. Unbuffered binary mode:
+        # text is encoded to UTF-8 up front and each write goes straight to the file
+        self._out_fh = open(self.output_file, 'wb', buffering=0)
+        header = (
+            f"Images with Comments - {album_name} (Web Scrape)\n"
+            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"Gallery URL: {self.gallery_url}\n"
+            + "=" * 50 + "\n"
+            "LIVE RESULTS (written as found):\n"
+            + "=" * 50 + "\n\n"
+        )
+        self._out_fh.write(header.encode('utf-8'))
         
         print(f"Output file initialized: {self.output_file}")
     
-    def _append_result_to_file(self, filename, comments, image_index):
+    async def _append_result_to_file(self, filename, comments, image_index, report):
         """Append a single result to output file immediately"""
         try:
-            with open(self.output_file, 'a') as f:
-                f.write(f"{filename}\n")
-                f.flush()  # Force write to disk
-            print(f"  ✓ Added to output file: {filename}")
+            # Write from the writer thread so a slow disk doesn't stall the browser connection
+            # (unbuffered, so it reaches the file right away)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._writer, self._out_fh.write, f"{filename}\n".encode('utf-8'))
+            report.append(f"  ✓ Added to output file: {filename}")
         except Exception as e:
-            print(f"  ! Error writing to file: {e}")
+            report.append(f"  ! Error writing to file: {e}")
+        
+    async def _wait_for_image_change(self, page, previous_url):
+        """Wait until the lightbox has navigated away from previous_url and rendered"""
+        try:
+            await page.wait_for_function("(prev) => location.href !== prev", arg=previous_url, timeout=5000)
+            await page.wait_for_selector(_LIGHTBOX_READY_SELECTOR, state='attached', timeout=3000)
+        except PlaywrightTimeoutError:
+            pass  # Inspect whatever is showing; a stuck view just yields no new comments
+    
+    async def _next_image(self, page):
+        """Move the lightbox to the next image with the right arrow key"""
+        previous_url = page.url
+        await page.keyboard.press('ArrowRight')
+        await self._wait_for_image_change(page, previous_url)
+    
+    async def _open_image(self, page, image_url):
+        """Navigate straight to an image's lightbox view and wait for it to render"""
+        await page.goto(image_url, wait_until='domcontentloaded')
+        try:
+            await page.wait_for_selector(_LIGHTBOX_READY_SELECTOR, state='attached', timeout=3000)
+        except PlaywrightTimeoutError:
+            pass  # Inspect whatever is showing
+    
+    async def _check_current_image(self, page, image_index, report):
+        """Look for client comments on the image currently shown and record any found, adding log lines to report"""
+        # Look for and click comment button (icon-based, no text)
+        view_comments_button = await page.query_selector('[class*="comment"]')
+        if view_comments_button:
+            report.append(f"    Found comment button (icon), clicking...")
+            await view_comments_button.click()
+            await wait_for_settle(page, timeout=2000)
+        
+        # Read comments and filename for the current image in one call
+        image_data = await self.extract_image_data(page, report)
+        comments_found = self.extract_image_comments(image_data, report)
+        
+        if comments_found:
+            # Get image filename/title
+            filename = self.get_image_filename(image_data, report)
+            if filename:
+                result_item = {
+                    'filename': filename,
+                    'comments': comments_found,
+                    'image_index': image_index
+                }
+                self.commented_images.append(result_item)
+                
+                # Write to file immediately (iterative writing). Other tabs can run while
+                # this awaits; the single writer thread keeps their writes apart
+                await self._append_result_to_file(filename, comments_found, image_index, report)
+                
+                report.append(f"  ✓ Found {len(comments_found)} comments on {filename}")
+            else:
+                report.append(f"  ✓ Found comments but couldn't extract filename")
+        else:
+            report.append(f"  - No comments found")
+    
+    async def _check_image_urls(self, page, image_urls):
+        """Check every lightbox URL, spreading them over SCRAPE_WORKERS tabs"""
+        # Extra tabs share the page's context, and so the gallery password cookie
+        pages = [page] + [await page.context.new_page() for _ in range(SCRAPE_WORKERS - 1)]
+        
+        # Each worker pulls the next URL from the shared iterator until none are left
+        pending = enumerate(image_urls, start=1)
+        
+        async def worker(worker_page):
+            for image_index, image_url in pending:
+                # Tabs interleave, so each image's log lines are printed together at the end
+                report = [f"Checking image {image_index}/{len(image_urls)}..."]
+                try:
+                    await self._open_image(worker_page, image_url)
+                    await self._check_current_image(worker_page, image_index, report)
+                except Exception as e:
+                    report.append(f"  Error processing image {image_index}: {str(e)}")
+                print("\n".join(report))
+        
+        await asyncio.gather(*(worker(worker_page) for worker_page in pages))
         
+        # Results arrive in completion order; keep the summary in gallery order
+        self.commented_images.sort(key=lambda item: item['image_index'])
+    
     async def scrape_gallery_comments(self):
         """Main method to scrape comments from SmugMug gallery"""
         print("SmugMug Web Scraper - Client Selection Tool")
@@ -65,7 +342,7 @@ class SmugMugWebScraper:
         
         async with async_playwright() as p:
             # Launch browser (headless=False for debugging, True for production)
-            browser = await p.chromium.launch(headless=False)  # Set to True for production
+            browser = await p.chromium.launch(headless=True, args=_BROWSER_ARGS)
             context = await browser.new_context()
             page = await context.new_page()
             
@@ -75,7 +352,7 @@ class SmugMugWebScraper:
                 await page.goto(self.gallery_url, timeout=30000)
                 
                 # Wait a moment for page to load
-                await page.wait_for_timeout(3000)
+                await wait_for_settle(page)
                 
                 # Check if password is required
                 password_input = await page.query_selector('input[type="password"]')
@@ -92,7 +369,7 @@ class SmugMugWebScraper:
                         await password_input.press('Enter')
                     
                     # Wait for gallery to load
-                    await page.wait_for_timeout(3000)
+                    await wait_for_settle(page)
                 
                 print("Gallery loaded. Scanning for images...")
                 
@@ -102,344 +379,227 @@ class SmugMugWebScraper:
                 # Handle lazy loading by scrolling to load all images
                 print("Scrolling to lazy-load all images...")
                 
-                # Scroll down multiple times to trigger lazy loading
-                last_count = 0
-                scroll_attempts = 0
-                max_scroll_attempts = 20
-                
-                while scroll_attempts < max_scroll_attempts:
-                    # Get current image count
-                    current_images = await page.query_selector_all('a[href*="/i-"], img[src*="smugmug"]')
-                    current_count = len(current_images)
-                    
-                    print(f"  Scroll attempt {scroll_attempts + 1}: Found {current_count} images")
-                    
-                    # If no new images loaded, try a few more times then stop
-                    if current_count == last_count:
-                        if scroll_attempts >= 3:  # Give it 3 more tries
-                            print(f"  No new images loaded after {scroll_attempts + 1} attempts")
-                            break
-                    else:
-                        scroll_attempts = 0  # Reset if we found new images
-                    
-                    last_count = current_count
-                    
-                    # Scroll down to load more images
-                    await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                    await page.wait_for_timeout(2000)
-                    scroll_attempts += 1
+                # Keep scrolling in the page until no new images show up for a few checks
+                # (capped at 40 s)
+                loaded_count = await page.evaluate(SCROLL_UNTIL_STABLE_JS, {
+                    'selector': 'a[href*="/i-"], img[src*="smugmug"]',
+                    'intervalMs': 400,
+                    'stableTicks': 3,
+                    'maxTicks': 100
+                })
+                print(f"  Lazy loading settled at {loaded_count} images")
                 
-                # Get final image count - use more specific selector to avoid duplicates
-                # Try to get unique clickable image elements (prefer links over images)
-                link_elements = await page.query_selector_all('a[href*="/i-"]')
+                # Collect unique image URLs in one round-trip (prefer links over images)
+                gallery_images = await page.evaluate(UNIQUE_IMAGE_URLS_JS)
+                image_urls = gallery_images['urls']
+                print(f"Total UNIQUE images found: {len(image_urls)} (expected ~268)")
+                print(f"Deduplication removed {gallery_images['rawCount'] - len(image_urls)} duplicate elements")
                 
-                # If no links found, try image elements
-                if not link_elements:
-                    image_elements = await page.query_selector_all('img[src*="smugmug"], .sm-tile img, .sm-gallery-image img')
-                else:
-                    image_elements = link_elements
-                
-                # Deduplicate by href/src to get actual unique images
-                unique_elements = []
-                seen_urls = set()
-                
-                for element in image_elements:
-                    try:
-                        if element.evaluate:
-                            href = await element.get_attribute('href')
-                            if href and '/i-' in href:
-                                if href not in seen_urls:
-                                    unique_elements.append(element)
-                                    seen_urls.add(href)
-                            else:
-                                src = await element.get_attribute('src')
-                                if src and src not in seen_urls:
-                                    unique_elements.append(element)
-                                    seen_urls.add(src)
-                    except:
-                        continue
-                
-                image_elements = unique_elements
-                print(f"Total UNIQUE images found: {len(image_elements)} (expected ~268)")
-                print(f"Deduplication removed {len(await page.query_selector_all('a[href*=\"/i-\"], img[src*=\"smugmug\"]')) - len(image_elements)} duplicate elements")
-                
-                if len(image_elements) == 0:
+                if len(image_urls) == 0:
                     print("ERROR: No image elements found. The gallery structure may be different than expected.")
                     # Take a screenshot for debugging
-                    await page.screenshot(path="/Users/trigg/Development/SmugMug-Client-Selection-Tool/output/debug_gallery.png")
+                    await page.screenshot(path=os.path.join(ensure_output_directory(), 'debug_gallery.png'))
                     print("Debug screenshot saved to output/debug_gallery.png")
                     return []
                 
-                # Click first image to enter lightbox mode
-                if len(image_elements) > 0:
-                    print("Entering lightbox mode with first image...")
-                    first_image = image_elements[0]
-                    await first_image.click()
-                    await page.wait_for_timeout(3000)
-                    
-                    # Process all images using arrow key navigation
-                    for i in range(len(image_elements)):
-                        try:
-                            print(f"Checking image {i+1}/{len(image_elements)}...")
-                            
-                            # Look for and click comment button (icon-based, no text)
-                            view_comments_button = await page.query_selector('[class*="comment"]')
-                            if view_comments_button:
-                                print(f"    Found comment button (icon), clicking...")
-                                await view_comments_button.click()
-                                await page.wait_for_timeout(2000)
-                            
-                            # Check for comments on the current image
-                            comments_found = await self.extract_image_comments(page)
-                            
-                            if comments_found:
-                                # Get image filename/title
-                                filename = await self.get_image_filename(page)
-                                if filename:
-                                    result_item = {
-                                        'filename': filename,
-                                        'comments': comments_found,
-                                        'image_index': i + 1
-                                    }
-                                    self.commented_images.append(result_item)
-                                    
-                                    # Write to file immediately (iterative writing)
-                                    self._append_result_to_file(filename, comments_found, i + 1)
-                                    
-                                    print(f"  ✓ Found {len(comments_found)} comments on {filename}")
-                                else:
-                                    print(f"  ✓ Found comments but couldn't extract filename")
-                            else:
-                                print(f"  - No comments found")
+                if len(image_urls) > 0:
+                    if gallery_images['links']:
+                        # Open each image's lightbox URL directly, several tabs at a time
+                        await self._check_image_urls(page, image_urls)
+                    else:
+                        # Only image sources to go on - click first image to enter lightbox mode
+                        print("Entering lightbox mode with first image...")
+                        first_image = await page.query_selector(gallery_images['selector'])
+                        gallery_page_url = page.url
+                        await first_image.click()
+                        await self._wait_for_image_change(page, gallery_page_url)
+                        
+                        # Process all images using arrow key navigation
+                        for i in range(len(image_urls)):
+                            report = [f"Checking image {i+1}/{len(image_urls)}..."]
+                            try:
+                                await self._check_current_image(page, i + 1, report)
+                            except Exception as e:
+                                report.append(f"  Error processing image {i+1}: {str(e)}")
+                            print("\n".join(report))
                             
                             # Move to next image using right arrow key (except for last image)
-                            if i < len(image_elements) - 1:
-                                await page.keyboard.press('ArrowRight')
-                                await page.wait_for_timeout(2000)  # Wait for next image to load
-                            
-                        except Exception as e:
-                            print(f"  Error processing image {i+1}: {str(e)}")
-                            # Try to continue to next image
-                            if i < len(image_elements) - 1:
-                                await page.keyboard.press('ArrowRight')
-                                await page.wait_for_timeout(2000)
-                            continue
+                            if i < len(image_urls) - 1:
+                                await self._next_image(page)  # Waits for next image to load
                 else:
                     print("No images found to process")
                 
                 print(f"\nScan complete! Found {len(self.commented_images)} images with comments")
                 
                 # Update output file with final summary
-                self._finalize_output_file()
+                await self._finalize_output_file()
                 
             except Exception as e:
                 print(f"Error during scraping: {str(e)}")
                 # Take screenshot for debugging
-                await page.screenshot(path="/Users/trigg/Development/SmugMug-Client-Selection-Tool/output/debug_error.png")
+                await page.screenshot(path=os.path.join(ensure_output_directory(), 'debug_error.png'))
                 print("Debug screenshot saved to output/debug_error.png")
                 
             finally:
                 await browser.close()
+                await self._close_output_file()
         
         return self.commented_images
     
-    async def extract_image_comments(self, page):
-        """Extract comments from the current image page - specifically looking for Clair Polleti"""
-        comments = []
-        
+    async def extract_image_data(self, page, report):
+        """Read comments and filename candidates for the current image in one page.evaluate"""
         try:
             # Wait for comments to load
-            await page.wait_for_timeout(3000)
+            await page.wait_for_load_state('domcontentloaded')
             
-            # Get all page text to search for Clair Polleti specifically
-            all_page_text = await page.evaluate('() => document.body.innerText')
+            return await page.evaluate(EXTRACT_IMAGE_DATA_JS, {
+                'clients': CLIENT_MATCHER_ARGS,
+                'filenamePattern': _FILENAME_RE.pattern,
+                'imgSrcPattern': _IMG_SRC_FILENAME_RE.pattern,
+                'commentsContainerSelector': _COMMENTS_CONTAINER_SELECTOR,
+                'commentSelectors': _COMMENT_SELECTORS,
+                'overlaySelectors': _OVERLAY_SELECTORS,
+                'findFilename': page.url not in self._filename_cache
+            })
             
-            # Check specifically for "Clair Polleti" (and variations)
-            target_names = ['clair polleti', 'clair', 'polleti']
-            has_clair_comment = any(name in all_page_text.lower() for name in target_names)
+        except PlaywrightError as e:
+            # Only browser-side failures mean "nothing readable here"; bugs should surface
+            report.append(f"    Error extracting comments: {str(e)}")
+            return None
+    
+    def extract_image_comments(self, image_data, report):
+        """Extract comments from the current image data - specifically looking for the clients in TARGET_NAMES"""
+        comments = []
+        
+        # Nothing more to do when no client is mentioned anywhere
+        if not image_data or not image_data['hasTarget']:
+            report.append(f"    No client comments found")
+            return comments
+        
+        report.append(f"    Found client comment!")
+        
+        if image_data['comments']:
+            found_selector = image_data['selector']
+            report.append(f"    Found {len(image_data['comments'])} client comments using selector: {found_selector}")
             
-            if has_clair_comment:
-                print(f"    Found Clair Polleti comment!")
-                
-                # Look for comment elements specifically containing Clair's name
-                comment_selectors = [
-                    '.sm-comments .sm-comment',
-                    '.comments .comment', 
-                    '.sm-user-ui-comments .sm-user-ui-comment',
-                    '[class*="comment"]',
-                    '[id*="comment"]',
-                    '.sm-comment',
-                    '.sm-comments',
-                    'div[class*="user"]',
-                    'div[class*="message"]',
-                    'span[class*="comment"]',
-                    'p[class*="comment"]'
-                ]
-                
-                comment_elements = []
-                found_selector = None
-                
-                for selector in comment_selectors:
-                    elements = await page.query_selector_all(selector)
-                    if elements:
-                        # Check if any elements contain Clair's name
-                        for element in elements:
-                            try:
-                                text = await element.inner_text()
-                                if text and any(name in text.lower() for name in target_names):
-                                    comment_elements.append(element)
-                                    found_selector = selector
-                            except:
-                                continue
-                        if comment_elements:
-                            break
-                
-                if comment_elements:
-                    print(f"    Found {len(comment_elements)} comments from Clair using selector: {found_selector}")
-                    
-                    # Extract Clair's comments
-                    for element in comment_elements:
-                        try:
-                            comment_text = await element.inner_text()
-                            if comment_text and any(name in comment_text.lower() for name in target_names):
-                                comments.append({
-                                    'author': 'Clair Polleti',
-                                    'text': comment_text.strip(),
-                                    'timestamp': '',
-                                    'selector_used': found_selector
-                                })
-                        except Exception as e:
-                            continue
-                
-                # Also search in all page text for Clair's comments
-                if not comments:
-                    print(f"    Searching page text for Clair's comments...")
-                    
-                    # Split text into potential comment blocks and look for Clair's name
-                    text_blocks = all_page_text.split('\n')
-                    for block in text_blocks:
-                        block = block.strip()
-                        if block and len(block) > 10 and any(name in block.lower() for name in target_names):
-                            comments.append({
-                                'author': 'Clair Polleti', 
-                                'text': block,
-                                'timestamp': '',
-                                'selector_used': 'text_search'
-                            })
+            # Extract the clients' comments; the page attributes each to the client it mentions
+            for comment in image_data['comments']:
+                comments.append({
+                    'author': comment['author'] or 'Unknown',
+                    'text': comment['text'],
+                    'timestamp': '',
+                    'selector_used': found_selector
+                })
+        
+        # Also search in all page text for the clients' comments
+        if not comments:
+            report.append(f"    Searching page text for client comments...")
             
-            # Debug output if no Clair comments found
-            if not comments:
-                print(f"    No comments from Clair Polleti found")
-            else:
-                print(f"    Found {len(comments)} comments from Clair Polleti")
-                        
-        except Exception as e:
-            print(f"    Error extracting comments: {str(e)}")
+            for block in image_data['textBlocks']:
+                comments.append({
+                    'author': block['author'] or 'Unknown', 
+                    'text': block['text'],
+                    'timestamp': '',
+                    'selector_used': 'text_search'
+                })
+        
+        # Debug output if no client comments found
+        if not comments:
+            report.append(f"    No client comments found")
+        else:
+            authors = sorted({comment['author'] for comment in comments})
+            report.append(f"    Found {len(comments)} comments from {', '.join(authors)}")
         
         return comments
     
-    async def get_image_filename(self, page):
-        """Extract the filename from the bottom left corner overlay of the image"""
-        try:
-            # Method 1: Look for filename overlay text in bottom left corner
-            # SmugMug typically shows filename as overlay text on images
-            
-            # Try various selectors for overlay text
-            overlay_selectors = [
-                '.sm-lightbox-overlay-text',
-                '.sm-image-overlay',
-                '.sm-filename-overlay',
-                '[class*="overlay"][class*="text"]',
-                '[class*="filename"]',
-                '.sm-lightbox-info',
-                '.sm-image-title',
-                '.sm-image-name'
-            ]
-            
-            for selector in overlay_selectors:
-                overlay_element = await page.query_selector(selector)
-                if overlay_element:
-                    overlay_text = await overlay_element.inner_text()
-                    if overlay_text:
-                        # Look for filename pattern in overlay text
-                        filename_match = re.search(r'([^/\\:]*\.(jpg|jpeg|png|gif|raw|dng|tiff|bmp|cr2|nef|arw))', overlay_text, re.IGNORECASE)
-                        if filename_match:
-                            print(f"    Found filename in overlay: {filename_match.group(1)}")
-                            return filename_match.group(1)
-            
-            # Method 2: Look for any text elements that might contain filename
-            # SmugMug might show filename as regular text overlay
-            all_text_elements = await page.query_selector_all('div, span, p')
-            for element in all_text_elements:
-                try:
-                    text = await element.inner_text()
-                    if text and len(text) < 100:  # Filename shouldn't be too long
-                        filename_match = re.search(r'([^/\\:]*\.(jpg|jpeg|png|gif|raw|dng|tiff|bmp|cr2|nef|arw))', text, re.IGNORECASE)
-                        if filename_match:
-                            # Check if this element is positioned like an overlay (bottom area)
-                            bbox = await element.bounding_box()
-                            if bbox and bbox['y'] > 400:  # Likely in bottom area
-                                print(f"    Found filename in bottom overlay: {filename_match.group(1)}")
-                                return filename_match.group(1)
-                except:
-                    continue
-            
-            # Method 3: Check page title
-            title = await page.title()
-            if title and title != "SmugMug":
-                filename_match = re.search(r'([^/\\:]*\.(jpg|jpeg|png|gif|raw|dng|tiff|bmp|cr2|nef|arw))', title, re.IGNORECASE)
-                if filename_match:
-                    print(f"    Found filename in title: {filename_match.group(1)}")
-                    return filename_match.group(1)
-            
-            # Method 4: Extract from URL
-            current_url = page.url
-            url_match = re.search(r'/i-([a-zA-Z0-9]+)', current_url)
-            if url_match:
-                return f"Image_{url_match.group(1)}"
+    def get_image_filename(self, image_data, report):
+        """Pick the filename for the current image, preferring the bottom left corner overlay"""
+        url = image_data['url']
+        if url in self._filename_cache:
+            report.append(f"    Filename already known for this view: {self._filename_cache[url]}")
+            return self._filename_cache[url]
+        
+        # Names shown on the page are remembered per lightbox URL, so a revisit skips
+        # gathering candidates. Fallbacks below aren't, so a revisit can still find the real name.
+        filename = self._shown_filename(image_data, report)
+        if filename:
+            self._filename_cache[url] = filename
+            return filename
+        
+        # Method 4: Extract from URL
+        url_match = _URL_IMAGE_ID_RE.search(url)
+        if url_match:
+            return f"Image_{url_match.group(1)}"
+        
+        # Method 5: img src attribute
+        if image_data['imgSrcFilename']:
+            return image_data['imgSrcFilename']
+        
+        return f"Unknown_{datetime.now().strftime('%H%M%S')}"
+    
+    def _shown_filename(self, image_data, report):
+        """Return the filename displayed on the page for the current image, or None"""
+        # Method 1: Filename overlay text in bottom left corner
+        # SmugMug typically shows filename as overlay text on images
+        if image_data['overlayFilename']:
+            report.append(f"    Found filename in overlay: {image_data['overlayFilename']}")
+            return image_data['overlayFilename']
+        
+        # Method 2: Any text element in the bottom area that contains a filename
+        # SmugMug might show filename as regular text overlay
+        if image_data['bottomFilename']:
+            report.append(f"    Found filename in bottom overlay: {image_data['bottomFilename']}")
+            return image_data['bottomFilename']
+        
+        # Method 3: Page title
+        if image_data['titleFilename']:
+            report.append(f"    Found filename in title: {image_data['titleFilename']}")
+            return image_data['titleFilename']
+        
+        return None
+    
+    async def _finalize_output_file(self):
+        """Add final summary to output file and close it"""
+        lines = [
+            "\n" + "=" * 50,
+            "FINAL SUMMARY:",
+            "=" * 50,
+            f"Total: {len(self.commented_images)} images with comments",
+            f"Scan completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
             
-            # Method 5: Try to get from img src attribute
-            img_element = await page.query_selector('img[src*="smugmug"]')
-            if img_element:
-                img_src = await img_element.get_attribute('src')
-                if img_src:
-                    filename_match = re.search(r'/([^/]*\.(jpg|jpeg|png|gif|raw|dng|tiff|bmp))', img_src, re.IGNORECASE)
-                    if filename_match:
-                        return filename_match.group(1)
+            # Include comment details
+            "\n" + "=" * 50,
+            "COMMENT DETAILS:",
+            "=" * 50 + "\n",
+        ]
+        
+        for item in self.commented_images:
+            lines.append(f"File: {item['filename']}")
+            lines.append(f"Comments ({len(item['comments'])}):")
             
-            return f"Unknown_{datetime.now().strftime('%H%M%S')}"
+            for comment in item['comments']:
+                author = comment.get('author', 'Unknown')
+                text = comment.get('text', '')
+                lines.append(f"  - {author}: {text}")
             
-        except Exception as e:
-            print(f"    Error getting filename: {str(e)}")
-            return f"Unknown_{datetime.now().strftime('%H%M%S')}"
-    
-    def _finalize_output_file(self):
-        """Add final summary to output file"""
+            lines.append("")
+        
         try:
-            with open(self.output_file, 'a') as f:
-                f.write(f"\n" + "=" * 50 + "\n")
-                f.write(f"FINAL SUMMARY:\n")
-                f.write(f"=" * 50 + "\n")
-                f.write(f"Total: {len(self.commented_images)} images with comments\n")
-                f.write(f"Scan completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                
-                # Include comment details
-                f.write(f"\n" + "=" * 50 + "\n")
-                f.write(f"COMMENT DETAILS:\n")
-                f.write(f"=" * 50 + "\n\n")
-                
-                for item in self.commented_images:
-                    f.write(f"File: {item['filename']}\n")
-                    f.write(f"Comments ({len(item['comments'])}):\n")
-                    
-                    for comment in item['comments']:
-                        author = comment.get('author', 'Unknown')
-                        text = comment.get('text', '')
-                        f.write(f"  - {author}: {text}\n")
-                    
-                    f.write(f"\n")
+            # Write the whole summary in one call from the writer thread
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._writer, self._out_fh.write, ("\n".join(lines) + "\n").encode('utf-8'))
         except Exception as e:
             print(f"Error finalizing output file: {e}")
+        finally:
+            await self._close_output_file()
+    
+    async def _close_output_file(self):
+        """Close the output file if it is still open"""
+        if self._out_fh is not None:
+            fh, self._out_fh = self._out_fh, None
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._writer, fh.close)
+            self._writer.shutdown(wait=False)
     
     def save_results(self, album_name="Dragonhood"):
         """Return the output file path (file already written iteratively)"""
@@ -478,4 +638,6 @@ async def main():
 
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        uvloop.install()
     asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Client names for SmugMug Client Selection Tool
+
+Lists the clients whose comments mark an image as selected, and builds the
+matcher the web scraper runs in the page to find and attribute their comments.
+"""
+
+import re
+
+# Clients whose comments mark an image as selected
+TARGET_NAMES = ['Clair Polleti']
+
+# A name part counts as a whole word when no letter, mark, digit or underscore
+# touches it. Spelled out instead of \b, which is ASCII-only in JS ("Zoë" has no
+# word boundary after the ë there).
+_WORD_CHAR = r'[\p{L}\p{M}\p{N}_]'
+
+# Characters that must be escaped in a JS regex compiled with the u flag, which
+# rejects the extra escapes (\-, \#, ...) that re.escape adds
+_JS_SPECIAL_RE = re.compile(r'[\\^$.*+?()[\]{}|/]')
+
+
+def _js_escape(text):
+    """Escape text for use as a literal in a JS regex with the u flag"""
+    return _JS_SPECIAL_RE.sub(r'\\\g<0>', text)
+
+
+def build_target_pattern(names, whole_words=True):
+    """Build one alternation matching any client in names
+
+    Returns (pattern, clients): the regex source, with one capture group per
+    alternative, and the client each group belongs to (group n -> clients[n - 1]).
+    Every full name comes before any single name part, so "Clair Smith" is not
+    credited to "Clair Polleti" just because both are called Clair. A part shared
+    by several clients goes to the first of them in names. With whole_words=False
+    name parts also match inside other words. The pattern is JS regex
+    syntax, compiled in the page with the i and u flags (Python's re can't read \\p{...}).
+    """
+    full_names = []
+    name_parts = []
+    seen_parts = set()
+    for name in names:
+        parts = [_js_escape(part) for part in name.split()]
+        if len(parts) > 1:
+            full_names.append((r'\s*'.join(parts), name))
+        for part in parts:
+            if part.lower() not in seen_parts:
+                seen_parts.add(part.lower())
+                if whole_words:
+                    part = f'(?<!{_WORD_CHAR}){part}(?!{_WORD_CHAR})'
+                name_parts.append((part, name))
+
+    alternatives = full_names + name_parts
+    pattern = '|'.join(f'({source})' for source, _ in alternatives)
+    return pattern, [name for _, name in alternatives]
+
+
+def client_matcher_args(names):
+    """Argument for CLIENT_MATCHER_JS that matches the clients in names"""
+    pattern, clients = build_target_pattern(names)
+    mention_pattern, _ = build_target_pattern(names, whole_words=False)
+    return {'targetPattern': pattern, 'mentionPattern': mention_pattern, 'targetClients': clients}
+
+
+# Takes client_matcher_args(...) and returns the page-side helpers:
+# mentions(text) - does the text mention any client. Name parts needn't be whole words:
+#   textContent glues adjacent elements together ("<span>Clair</span><span>Love it</span>"
+#   reads "ClairLove it"), and a missed selection is worse than a stray match.
+# clientOf(text) - the client the text mentions first (the one whose group matched),
+#   preferring whole-word matches; null only when mentions(text) is false
+CLIENT_MATCHER_JS = """
+(args) => {
+    const targetRe = new RegExp(args.targetPattern, 'iu');
+    const mentionRe = new RegExp(args.mentionPattern, 'iu');
+    const clientOfMatch = (match) => {
+        const group = match ? match.findIndex((g, i) => i > 0 && g !== undefined) : -1;
+        return group > 0 ? args.targetClients[group - 1] : null;
+    };
+    return {
+        mentions: (text) => mentionRe.test(text),
+        clientOf: (text) => clientOfMatch(text.match(targetRe)) || clientOfMatch(text.match(mentionRe))
+    };
+}
+"""
+
+CLIENT_MATCHER_ARGS = client_matcher_args(TARGET_NAMES)
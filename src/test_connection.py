@@ -11,32 +11,47 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.config import load_credentials
 import requests
+from requests.adapters import HTTPAdapter
 from requests_oauthlib import OAuth1
+from urllib3.util.retry import Retry
 
+# Shared session so repeated API calls reuse pooled connections (and TLS sessions)
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3)
+))
+_SESSION.headers.update({
+    'Accept': 'application/json',
+    'User-Agent': 'SmugMug-Client-Selection-Tool/1.0'
+})
 
-def test_connection():
-    """Test connection to SmugMug API"""
-    print("Testing SmugMug API connection...")
-    
-    try:
-        # Load credentials
+
+def get_authed_session():
+    """Return the shared pooled session, signing its requests with the SmugMug OAuth credentials"""
+    if _SESSION.auth is None:
         credentials = load_credentials()
-        print("✓ Credentials loaded successfully")
-        
-        # Set up OAuth
-        auth = OAuth1(
+        _SESSION.auth = OAuth1(
             credentials['consumer_key'],
             client_secret=credentials['consumer_secret'],
             resource_owner_key=credentials['oauth_token'],
             resource_owner_secret=credentials['oauth_secret']
         )
+    return _SESSION
+
+
+def test_connection():
+    """Test connection to SmugMug API"""
+    print("Testing SmugMug API connection...")
+    
+    try:
+        # Load credentials and set up OAuth
+        session = get_authed_session()
+        print("✓ Credentials loaded successfully")
         
-        # Test API call - try the general user endpoint first with proper headers
-        headers = {
-            'Accept': 'application/json',
-            'User-Agent': 'SmugMug-Client-Selection-Tool/1.0'
-        }
-        response = requests.get("https://api.smugmug.com/api/v2!authuser", auth=auth, headers=headers)
+        # Test API call - try the general user endpoint first (session sends the JSON headers)
+        response = session.get("https://api.smugmug.com/api/v2!authuser")
         
         print(f"Response status: {response.status_code}")
         print(f"Response headers: {dict(response.headers)}")
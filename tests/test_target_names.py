@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the client matcher the web scraper runs in the page
+
+The matcher is JavaScript, so the cases run through node: that is the regex
+engine that decides in the browser, and Python's re disagrees with it on
+word boundaries around non-ASCII letters.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import unittest
+
+# Add the parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.target_names import CLIENT_MATCHER_JS, client_matcher_args
+
+
+def run_matcher(names, texts):
+    """Return [mentions, clientOf] from the page-side matcher for each text"""
+    script = (
+        f"const m = ({CLIENT_MATCHER_JS})({json.dumps(client_matcher_args(names))});\n"
+        f"console.log(JSON.stringify({json.dumps(texts)}.map(t => [m.mentions(t), m.clientOf(t)])));"
+    )
+    result = subprocess.run(['node', '-e', script], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def client_for(text, names):
+    """The client the page attributes text to, or None"""
+    [[_, client]] = run_matcher(names, [text])
+    return client
+
+
+@unittest.skipUnless(shutil.which('node'), "node is needed to run the page-side matcher")
+class ClientMatcherTests(unittest.TestCase):
+    def test_single_client(self):
+        names = ['Clair Polleti']
+        self.assertEqual(client_for("Clair Polleti: love this one", names), 'Clair Polleti')
+        self.assertEqual(client_for("clair  polleti", names), 'Clair Polleti')
+        self.assertEqual(client_for("Polleti likes it", names), 'Clair Polleti')
+        self.assertIsNone(client_for("No names here", names))
+
+    def test_full_name_beats_shared_first_name(self):
+        names = ['Clair Polleti', 'Clair Smith']
+        self.assertEqual(client_for("Clair Smith: this one please", names), 'Clair Smith')
+        self.assertEqual(client_for("Clair Polleti: this one please", names), 'Clair Polleti')
+        self.assertEqual(client_for("Smith wants a print", names), 'Clair Smith')
+
+    def test_shared_part_goes_to_first_client(self):
+        names = ['Clair Polleti', 'Clair Smith']
+        self.assertEqual(client_for("Clair wants this", names), 'Clair Polleti')
+
+    def test_non_ascii_names(self):
+        names = ['Zoë Müller']
+        self.assertEqual(client_for("Zoë: love it", names), 'Zoë Müller')
+        self.assertEqual(client_for("MÜLLER wants a print", names), 'Zoë Müller')
+
+    def test_names_with_regex_characters(self):
+        names = ['Mary-Jane St.John']
+        self.assertEqual(client_for("Mary-Jane: yes", names), 'Mary-Jane St.John')
+        self.assertIsNone(client_for("St John", names))
+
+    def test_name_glued_to_adjacent_element_text(self):
+        # textContent of <span>Clair</span><span>Love it</span>, which the page checks first
+        [[mentions, client]] = run_matcher(['Clair Polleti'], ["ClairLove it"])
+        self.assertTrue(mentions)
+        self.assertEqual(client, 'Clair Polleti')
+
+    def test_whole_word_match_preferred_for_attribution(self):
+        names = ['Ann Lee', 'Joe Polleti']
+        self.assertEqual(client_for("Joanne says: Polleti", names), 'Joe Polleti')
+        self.assertEqual(client_for("Joanne says: yes", names), 'Ann Lee')
+
+    def test_mentions_agrees_with_attribution(self):
+        texts = ["Clair Polleti: yes", "Polleti", "Nobody"]
+        results = run_matcher(['Clair Polleti'], texts)
+        self.assertEqual([mentions for mentions, _ in results], [True, True, False])
+        self.assertEqual([client is not None for _, client in results], [True, True, False])
+
+
+if __name__ == "__main__":
+    unittest.main()